@@ -1,16 +1,22 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
 from typing import List, Dict, Any
-from app.services.stock_service import stock_service
+from ...core.database import get_db
+from ...services.stock_service import StockService
 
 router = APIRouter()
 
 @router.get("/{symbol}")
 async def get_historical_data(
     symbol: str,
-    period: str = Query("1mo", regex="^(1d|5d|1mo|3mo|6mo|1y|2y|5y|10y|ytd|max)$")
+    period: str = Query("1mo", regex="^(1d|5d|1mo|3mo|6mo|1y|2y|5y|10y|ytd|max)$"),
+    db: Session = Depends(get_db)
 ) -> List[Dict[str, Any]]:
     """
     Get historical data for a specific symbol
+
+    Rows loaded by backfill.py are served from the database; Yahoo Finance
+    is only queried when none are stored for the period.
     
     Parameters:
     - symbol: Stock symbol (e.g., AAPL)
@@ -18,7 +24,7 @@ async def get_historical_data(
     """
     if not symbol:
         raise HTTPException(status_code=400, detail="Symbol query parameter is required.")
-    data = await stock_service.get_historical_data(symbol.upper(), period)
+    data = await StockService.get_historical_data(db, symbol.upper(), period)
     if not data:
         raise HTTPException(
             status_code=404,
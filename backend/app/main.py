@@ -2,7 +2,7 @@ import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .core.config import settings
-from .api.endpoints import stocks
+from .api.endpoints import stocks, historical
 from .core.database import engine, Base
 from fastapi_cache import FastAPICache
 from fastapi_cache.backends.redis import RedisBackend
@@ -33,6 +33,7 @@ app.add_middleware(
 
 # Include routers
 app.include_router(stocks.router, prefix=f"{settings.API_V1_STR}/stocks", tags=["stocks"])
+app.include_router(historical.router, prefix=f"{settings.API_V1_STR}/historical", tags=["historical"])
 
 # Initialize scheduler
 scheduler = StockDataScheduler()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, Boolean, UniqueConstraint
 from sqlalchemy.sql import func
 from ..core.database import Base
 
@@ -28,4 +28,44 @@ class Stock(Base):
             "sector": self.sector,
             "is_active": self.is_active,
             "last_updated": self.last_updated
-        } 
\ No newline at end of file
+        }
+
+
+class StockHistory(Base):
+    __tablename__ = "stock_history"
+    __table_args__ = (UniqueConstraint("symbol", "date", name="uq_stock_history_symbol_date"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    symbol = Column(String, index=True, nullable=False)
+    date = Column(String, nullable=False)  # Store the date as string in YYYY-MM-DD format
+    open = Column(Float)
+    high = Column(Float)
+    low = Column(Float)
+    close = Column(Float)
+    adj_close = Column(Float, nullable=True)
+    volume = Column(BigInteger)
+
+    def to_dict(self):
+        return {
+            "symbol": self.symbol,
+            "date": self.date,
+            "open": self.open,
+            "high": self.high,
+            "low": self.low,
+            "close": self.close,
+            "adj_close": self.adj_close,
+            "volume": self.volume
+        }
+
+
+class ImportedFile(Base):
+    """Bookkeeping for the offline backfill so re-runs skip unchanged files"""
+    __tablename__ = "imported_files"
+
+    id = Column(Integer, primary_key=True, index=True)
+    path = Column(String, unique=True, index=True, nullable=False)
+    size = Column(BigInteger)
+    mtime_ns = Column(BigInteger)
+    sha256 = Column(String)
+    row_count = Column(Integer)
+    imported_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
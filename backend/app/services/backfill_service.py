@@ -0,0 +1,401 @@
+import hashlib
+import io
+import logging
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, delete, insert, text, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.stock import ImportedFile, Stock, StockHistory
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = (".csv", ".parquet")
+REQUIRED_COLUMNS = ["date", "open", "high", "low", "close", "volume"]
+HISTORY_COLUMNS = ["symbol", "date", "open", "high", "low", "close", "adj_close", "volume"]
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Keep IN (...) lists well below SQLite's bound parameter limit
+_DELETE_BATCH_SIZE = 500
+
+# seq records COPY order so the merge keeps the last row for a date, like _insert_chunk
+_STAGING_DDL = """
+    CREATE TEMP TABLE stock_history_staging (
+        seq BIGSERIAL,
+        symbol TEXT, date TEXT, open FLOAT8, high FLOAT8, low FLOAT8,
+        close FLOAT8, adj_close FLOAT8, volume BIGINT
+    ) ON COMMIT DROP
+"""
+
+_STAGING_COPY = (
+    "COPY stock_history_staging (symbol, date, open, high, low, close, adj_close, volume) "
+    "FROM STDIN WITH (FORMAT csv)"
+)
+
+_STAGING_MERGE = """
+    INSERT INTO stock_history (symbol, date, open, high, low, close, adj_close, volume)
+    SELECT DISTINCT ON (symbol, date) symbol, date, open, high, low, close, adj_close, volume
+    FROM stock_history_staging
+    ORDER BY symbol, date, seq DESC
+    ON CONFLICT (symbol, date) DO UPDATE SET
+        open = EXCLUDED.open,
+        high = EXCLUDED.high,
+        low = EXCLUDED.low,
+        close = EXCLUDED.close,
+        adj_close = EXCLUDED.adj_close,
+        volume = EXCLUDED.volume
+"""
+
+# Engine owned by each worker process, created in _init_worker
+_worker_engine: Optional[Engine] = None
+
+
+def _init_worker(database_url: str) -> None:
+    """Give each worker process its own engine instead of the inherited pool"""
+    global _worker_engine
+    from ..core.database import engine
+    engine.dispose(close=False)
+    _worker_engine = create_engine(database_url)
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _iter_chunks(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Yield the file as DataFrames of at most chunk_size rows"""
+    if path.lower().endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("pyarrow is required to import Parquet files")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def _parse_dates(values: pd.Series) -> pd.Series:
+    """Parse a date column to YYYY-MM-DD strings (NaN where unparseable)"""
+    raw = values.astype(str).str.strip()
+    # Fast path for ISO dates/timestamps (yfinance exports): keep the exchange-local
+    # calendar date, ignoring any time/offset suffix
+    iso = pd.to_datetime(raw.str.slice(0, 10), format="%Y-%m-%d", errors="coerce")
+    dates = iso.dt.strftime("%Y-%m-%d")
+    unparsed = iso.isna()
+    if unparsed.any():
+        # Anything else (e.g. MM/DD/YYYY) goes through pandas' per-element inference
+        try:
+            fallback = pd.to_datetime(raw[unparsed], format="mixed", errors="coerce")
+        except ValueError:
+            # Mixed UTC offsets can't share one column, so parse each value on its own
+            fallback = raw[unparsed].map(lambda v: pd.to_datetime(v, errors="coerce"))
+        if pd.api.types.is_datetime64_any_dtype(fallback):
+            dates[unparsed] = fallback.dt.strftime("%Y-%m-%d")
+        else:
+            dates[unparsed] = fallback.map(lambda ts: ts.strftime("%Y-%m-%d") if pd.notna(ts) else None)
+    return dates
+
+
+def _normalize_chunk(df: pd.DataFrame, symbol: str) -> Tuple[pd.DataFrame, int]:
+    """Map a raw OHLCV chunk (e.g. a yfinance export) onto the stock_history columns
+
+    Returns the normalized rows and the number of rows dropped for an
+    unparseable date or a missing/non-finite close.
+    """
+    if not isinstance(df.index, pd.RangeIndex):
+        df = df.reset_index()
+    df = df.rename(columns=lambda c: str(c).strip().lower().replace(" ", "_"))
+
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"missing columns: {', '.join(missing)}")
+    if "adj_close" not in df.columns:
+        df["adj_close"] = float("nan")
+
+    df = df.assign(symbol=symbol, date=_parse_dates(df["date"]))
+    # Non-finite values (inf/-inf) are as unusable as missing ones
+    for column in ("open", "high", "low", "close", "adj_close", "volume"):
+        df[column] = pd.to_numeric(df[column], errors="coerce").replace([np.inf, -np.inf], np.nan)
+    df["volume"] = df["volume"].fillna(0).astype("int64")
+
+    valid = df[df["date"].notna() & df["close"].notna()]
+    dropped = len(df) - len(valid)
+    return valid.drop_duplicates(subset=["date"], keep="last")[HISTORY_COLUMNS], dropped
+
+
+def _copy_chunk(conn: Connection, chunk: pd.DataFrame) -> None:
+    """Stream a chunk into the staging table with COPY (PostgreSQL)"""
+    buffer = io.StringIO()
+    chunk.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(_STAGING_COPY, buffer)
+    finally:
+        cursor.close()
+
+
+def _insert_chunk(conn: Connection, chunk: pd.DataFrame) -> None:
+    """Insert a chunk with a single executemany (non-PostgreSQL databases)
+
+    Rows for the same dates from earlier chunks of the file are deleted
+    first, so the last row for a date wins as in _STAGING_MERGE.
+    """
+    table = StockHistory.__table__
+    symbol = chunk["symbol"].iloc[0]
+    dates = chunk["date"].tolist()
+    for start in range(0, len(dates), _DELETE_BATCH_SIZE):
+        conn.execute(
+            delete(table).where(
+                table.c.symbol == symbol,
+                table.c.date.in_(dates[start:start + _DELETE_BATCH_SIZE])
+            )
+        )
+    records = chunk.astype(object).where(chunk.notna(), None).to_dict("records")
+    conn.execute(insert(table), records)
+
+
+def _record_import(conn: Connection, path: str, size: int, mtime_ns: int, sha256: str, row_count: int) -> None:
+    table = ImportedFile.__table__
+    conn.execute(delete(table).where(table.c.path == path))
+    conn.execute(
+        insert(table).values(path=path, size=size, mtime_ns=mtime_ns, sha256=sha256, row_count=row_count)
+    )
+
+
+def _snapshot(symbol: str, tail: Optional[pd.DataFrame]) -> Optional[Dict[str, Any]]:
+    """Build a stocks row from the two most recent sessions, like get_stock_data does"""
+    if tail is None or tail.empty:
+        return None
+    latest = tail.iloc[-1]
+    latest_close = float(latest["close"])
+    latest_volume = int(latest["volume"])
+    prev_close = tail.iloc[-2]["close"] if len(tail) > 1 else latest["open"]
+    change_percent = (
+        ((latest_close - prev_close) / prev_close) * 100 if pd.notna(prev_close) and prev_close else 0.0
+    )
+    return {
+        "symbol": symbol,
+        "name": symbol,
+        "current_price": latest_close,
+        "change_percent": float(change_percent),
+        "volume": latest_volume,
+        "market_cap": float(latest_close * latest_volume),
+        "sector": "",
+        "is_active": True,
+        "last_updated": latest["date"]
+    }
+
+
+def _load_file(path: str, symbol: str, size: int, mtime_ns: int,
+               known_sha256: Optional[str], chunk_size: int) -> Dict[str, Any]:
+    """Replace a symbol's stock_history rows with one file, in a single transaction (runs in a worker)"""
+    sha256 = _file_sha256(path)
+    if sha256 == known_sha256:
+        # Touched but not modified: refresh the stat so the next run skips it cheaply
+        table = ImportedFile.__table__
+        with _worker_engine.begin() as conn:
+            conn.execute(update(table).where(table.c.path == path).values(size=size, mtime_ns=mtime_ns))
+        return {"path": path, "symbol": symbol, "status": "unchanged", "rows": 0, "dropped": 0, "snapshot": None}
+
+    rows = dropped = 0
+    tail: Optional[pd.DataFrame] = None
+    with _worker_engine.begin() as conn:
+        # The file is the source of truth for its symbol: dates removed from a
+        # corrected file must not survive the re-import
+        history = StockHistory.__table__
+        conn.execute(delete(history).where(history.c.symbol == symbol))
+
+        use_copy = conn.dialect.name == "postgresql"
+        if use_copy:
+            conn.execute(text(_STAGING_DDL))
+
+        for raw in _iter_chunks(path, chunk_size):
+            chunk, chunk_dropped = _normalize_chunk(raw, symbol)
+            dropped += chunk_dropped
+            if chunk.empty:
+                continue
+            if use_copy:
+                _copy_chunk(conn, chunk)
+            else:
+                _insert_chunk(conn, chunk)
+            rows += len(chunk)
+            recent = chunk if tail is None else pd.concat([tail, chunk])
+            tail = recent.drop_duplicates(subset=["date"], keep="last").sort_values("date").tail(2)
+
+        if rows == 0:
+            # Raising rolls back and leaves the file unrecorded, so the next run retries it
+            raise ValueError(f"no valid rows ({dropped} dropped for a bad date or missing close)")
+        if use_copy:
+            conn.execute(text(_STAGING_MERGE))
+        _record_import(conn, path, size, mtime_ns, sha256, rows)
+
+    return {
+        "path": path,
+        "symbol": symbol,
+        "status": "loaded",
+        "rows": rows,
+        "dropped": dropped,
+        "snapshot": _snapshot(symbol, tail)
+    }
+
+
+class BackfillService:
+    """Offline bulk import of per-symbol OHLCV files (e.g. data/AAPL.csv)"""
+
+    def __init__(self, db: Session, workers: Optional[int] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, force: bool = False):
+        self.db = db
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.force = force
+
+    @staticmethod
+    def discover_files(directory: str) -> List[Path]:
+        """Find CSV/Parquet files under directory; the file stem is the symbol"""
+        root = Path(directory)
+        if not root.is_dir():
+            raise ValueError(f"Not a directory: {directory}")
+        return sorted(p for p in root.rglob("*") if p.is_file() and p.suffix.lower() in SUPPORTED_EXTENSIONS)
+
+    @staticmethod
+    def split_duplicate_symbols(files: List[Path]) -> Tuple[List[Path], List[Path]]:
+        """Separate files that are the only source for their symbol from ambiguous ones
+
+        Two files for one symbol (AAPL.csv and AAPL.parquet, or sub/AAPL.csv)
+        would race to replace the same rows, so neither is loaded.
+        """
+        by_symbol: Dict[str, List[Path]] = defaultdict(list)
+        for file in files:
+            by_symbol[file.stem.upper()].append(file)
+
+        unique: List[Path] = []
+        duplicates: List[Path] = []
+        for symbol, group in by_symbol.items():
+            if len(group) == 1:
+                unique.extend(group)
+                continue
+            logger.error(
+                f"Skipping {symbol}: {len(group)} files map to it ({', '.join(str(f) for f in group)}); "
+                f"keep one file per symbol"
+            )
+            duplicates.extend(group)
+        return sorted(unique), sorted(duplicates)
+
+    def _pending_files(self, files: List[Path]) -> List[Dict[str, Any]]:
+        """Drop files whose size and mtime match the last successful import"""
+        known = {record.path: record for record in self.db.query(ImportedFile).all()}
+        pending = []
+        for file in files:
+            path = str(file.resolve())
+            stat = file.stat()
+            record = known.get(path)
+            if (not self.force and record
+                    and record.size == stat.st_size and record.mtime_ns == stat.st_mtime_ns):
+                continue
+            pending.append({
+                "path": path,
+                "symbol": file.stem.upper(),
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "known_sha256": None if self.force or not record else record.sha256
+            })
+        return pending
+
+    def _update_stocks(self, snapshots: Dict[str, Dict[str, Any]]) -> int:
+        """Upsert the latest imported session per symbol into the stocks table"""
+        if not snapshots:
+            return 0
+        existing = {
+            stock.symbol: stock
+            for stock in self.db.query(Stock).filter(Stock.symbol.in_(list(snapshots))).all()
+        }
+        for symbol, data in snapshots.items():
+            stock = existing.get(symbol)
+            if stock is None:
+                self.db.add(Stock(**data))
+            elif not stock.last_updated or stock.last_updated <= data["last_updated"]:
+                # Never overwrite fresher live quotes with older file data
+                for key in ("current_price", "change_percent", "volume", "market_cap", "last_updated"):
+                    setattr(stock, key, data[key])
+        try:
+            self.db.commit()
+            return len(snapshots)
+        except Exception as e:
+            logger.error(f"Error updating stocks from backfill: {str(e)}")
+            self.db.rollback()
+            return 0
+
+    def run(self, directory: str) -> Dict[str, Any]:
+        """Load every new or changed file in directory"""
+        files = self.discover_files(directory)
+        candidates, duplicates = self.split_duplicate_symbols(files)
+        pending = self._pending_files(candidates)
+        # Release the session's connection before forking workers
+        self.db.rollback()
+        logger.info(f"Backfill: {len(files)} files found, {len(pending)} new or changed")
+
+        loaded = rows = 0
+        unchanged = len(candidates) - len(pending)
+        failed = len(duplicates)
+        snapshots: Dict[str, Dict[str, Any]] = {}
+        if pending:
+            with ProcessPoolExecutor(
+                max_workers=min(self.workers, len(pending)),
+                initializer=_init_worker,
+                initargs=(settings.DATABASE_URL,)
+            ) as executor:
+                futures = {
+                    executor.submit(
+                        _load_file, item["path"], item["symbol"], item["size"],
+                        item["mtime_ns"], item["known_sha256"], self.chunk_size
+                    ): item
+                    for item in pending
+                }
+                for future in as_completed(futures):
+                    item = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"Error importing {item['path']}: {str(e)}")
+                        failed += 1
+                        continue
+
+                    if result["status"] == "unchanged":
+                        unchanged += 1
+                        continue
+                    loaded += 1
+                    rows += result["rows"]
+                    logger.info(f"Loaded {result['rows']} rows for {result['symbol']} from {result['path']}")
+                    if result["dropped"]:
+                        logger.warning(
+                            f"Dropped {result['dropped']} rows with a bad date or missing close from {result['path']}"
+                        )
+                    if result["snapshot"]:
+                        snapshots[result["symbol"]] = result["snapshot"]
+
+        stocks_updated = self._update_stocks(snapshots)
+        message = f"Loaded {rows} rows from {loaded} files ({unchanged} unchanged, {failed} failed)"
+        logger.info(message)
+        return {
+            "message": message,
+            "files": len(files),
+            "loaded": loaded,
+            "unchanged": unchanged,
+            "failed": failed,
+            "rows": rows,
+            "stocks_updated": stocks_updated
+        }
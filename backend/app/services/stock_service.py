@@ -3,15 +3,20 @@ import pandas as pd
 import pandas_datareader as pdr
 from typing import List, Dict, Any, Optional
 import asyncio
-from ..models.stock import Stock
+from ..models.stock import Stock, StockHistory
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 import logging
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import requests
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+# Periods accepted by the historical endpoint, mapped onto stock_history lookups
+HISTORY_PERIOD_SESSIONS = {"1d": 1, "5d": 5}
+HISTORY_PERIOD_DAYS = {"1mo": 30, "3mo": 91, "6mo": 182, "1y": 365, "2y": 730, "5y": 1826, "10y": 3652}
+
 class StockService:
     def __init__(self, db: Session):
         self.db = db
@@ -86,6 +91,154 @@ class StockService:
             logger.error(f"Error parsing data for {symbol}: {str(e)}")
             return None
 
+    @staticmethod
+    async def fetch_historical_data(symbol: str, period: str) -> List[dict]:
+        """Fetch daily history directly from Yahoo Finance API"""
+        try:
+            logger.info(f"Fetching {period} history for symbol: {symbol}")
+            url = f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
+            params = {
+                "range": period,
+                "interval": "1d",
+                "includePrePost": False
+            }
+            headers = {
+                "User-Agent": "Mozilla/5.0"
+            }
+            response = requests.get(url, params=params, headers=headers)
+            response.raise_for_status()
+            data = response.json()
+
+            if not data["chart"]["result"]:
+                logger.error(f"No history returned for {symbol}")
+                return []
+
+            result = data["chart"]["result"][0]
+            quote = result["indicators"]["quote"][0]
+            adjclose = result["indicators"].get("adjclose", [{}])[0].get("adjclose")
+            history = []
+            for i, timestamp in enumerate(result.get("timestamp") or []):
+                if quote["close"][i] is None:
+                    continue
+                history.append({
+                    "symbol": symbol,
+                    "date": datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d"),
+                    "open": quote["open"][i],
+                    "high": quote["high"][i],
+                    "low": quote["low"][i],
+                    "close": quote["close"][i],
+                    "adj_close": adjclose[i] if adjclose else None,
+                    "volume": quote["volume"][i]
+                })
+            return history
+
+        except requests.exceptions.RequestException as e:
+            logger.error(f"History request failed for {symbol}: {str(e)}")
+            return []
+        except (KeyError, IndexError, TypeError) as e:
+            logger.error(f"Error parsing history for {symbol}: {str(e)}")
+            return []
+
+    @staticmethod
+    def last_session_date(today: date) -> date:
+        """Most recent weekday before today, i.e. the latest session with a final close"""
+        day = today - timedelta(days=1)
+        while day.weekday() >= 5:
+            day -= timedelta(days=1)
+        return day
+
+    @staticmethod
+    def get_stored_history(db: Session, symbol: str, period: str) -> List[StockHistory]:
+        """Get daily history for a period from the stock_history table"""
+        today = datetime.now().date()
+        query = db.query(StockHistory).filter(StockHistory.symbol == symbol)
+
+        if period in HISTORY_PERIOD_SESSIONS:
+            # Last N trading sessions, as long as they are from the past week
+            start = today - timedelta(days=7)
+            rows = (
+                query.filter(StockHistory.date >= start.strftime("%Y-%m-%d"))
+                .order_by(StockHistory.date.desc())
+                .limit(HISTORY_PERIOD_SESSIONS[period])
+                .all()
+            )
+            return list(reversed(rows))
+
+        if period == "ytd":
+            query = query.filter(StockHistory.date >= today.replace(month=1, day=1).strftime("%Y-%m-%d"))
+        elif period in HISTORY_PERIOD_DAYS:
+            start = today - timedelta(days=HISTORY_PERIOD_DAYS[period])
+            query = query.filter(StockHistory.date >= start.strftime("%Y-%m-%d"))
+        return query.order_by(StockHistory.date.asc()).all()
+
+    @staticmethod
+    def stored_history_covers(db: Session, symbol: str, period: str) -> bool:
+        """Check that stock_history spans the whole period, up to the last session"""
+        today = datetime.now().date()
+        earliest, latest = (
+            db.query(func.min(StockHistory.date), func.max(StockHistory.date))
+            .filter(StockHistory.symbol == symbol)
+            .one()
+        )
+        if not latest or latest < StockService.last_session_date(today).strftime("%Y-%m-%d"):
+            return False
+
+        if period == "ytd":
+            start = today.replace(month=1, day=1)
+        elif period in HISTORY_PERIOD_DAYS:
+            start = today - timedelta(days=HISTORY_PERIOD_DAYS[period])
+        else:
+            # 1d/5d only need recent sessions; "max" is whatever was backfilled
+            return True
+        # Allow for the period starting on a weekend or holiday
+        return earliest <= (start + timedelta(days=7)).strftime("%Y-%m-%d")
+
+    @staticmethod
+    def save_history(db: Session, rows: List[dict]) -> None:
+        """Store fetched sessions so later requests are served from the database"""
+        if not rows:
+            return
+        try:
+            db.add_all([StockHistory(**row) for row in rows])
+            db.commit()
+            logger.info(f"Stored {len(rows)} new history rows for {rows[0]['symbol']}")
+        except Exception as e:
+            logger.error(f"Error saving history for {rows[0]['symbol']}: {str(e)}")
+            db.rollback()
+
+    @staticmethod
+    async def get_historical_data(db: Session, symbol: str, period: str = "1mo") -> List[dict]:
+        """Get daily history from stock_history, filling any gaps from Yahoo Finance"""
+        stored = [row.to_dict() for row in StockService.get_stored_history(db, symbol, period)]
+        if stored and StockService.stored_history_covers(db, symbol, period):
+            logger.info(f"Serving {len(stored)} stored history rows for {symbol} ({period})")
+            return stored
+
+        fetched = await StockService.fetch_historical_data(symbol, period)
+        if not fetched:
+            if stored:
+                logger.warning(f"Serving {len(stored)} stored history rows for {symbol} without a Yahoo refresh")
+            return stored
+
+        latest_stored = (
+            db.query(func.max(StockHistory.date)).filter(StockHistory.symbol == symbol).scalar()
+        )
+        if latest_stored:
+            # Extend backfilled symbols with the sessions they are missing; skip
+            # today's row, whose close is not final yet
+            today = datetime.now().strftime("%Y-%m-%d")
+            StockService.save_history(
+                db, [row for row in fetched if latest_stored < row["date"] < today]
+            )
+
+        # Stored rows win for dates both sources have
+        merged = {row["date"]: row for row in fetched}
+        merged.update({row["date"]: row for row in stored})
+        history = [merged[day] for day in sorted(merged)]
+        if period in HISTORY_PERIOD_SESSIONS:
+            return history[-HISTORY_PERIOD_SESSIONS[period]:]
+        return history
+
     @staticmethod
     def get_all_stocks(db: Session) -> List[Stock]:
         """Get all stocks from database"""
@@ -0,0 +1,31 @@
+import argparse
+import sys
+
+from app.core.database import SessionLocal
+from app.core.init_db import init_db
+from app.services.backfill_service import BackfillService, DEFAULT_CHUNK_SIZE
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Bulk load historical OHLCV data from a directory of per-symbol CSV/Parquet files"
+    )
+    parser.add_argument("directory", help="Directory of files named after their symbol, e.g. AAPL.csv")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows read per chunk")
+    parser.add_argument("--force", action="store_true", help="Reload files even if they are unchanged")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        result = BackfillService(db, workers=args.workers, chunk_size=args.chunk_size, force=args.force).run(args.directory)
+    finally:
+        db.close()
+    print(result["message"])
+    if result["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
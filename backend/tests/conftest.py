@@ -0,0 +1,48 @@
+import os
+import tempfile
+
+# Point the app at a throwaway SQLite file before anything imports app.core
+_db_dir = tempfile.mkdtemp(prefix="stockmarket-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.core.database import Base, SessionLocal, engine
+from app.services import backfill_service
+
+
+@pytest.fixture
+def db():
+    """Session on a freshly created SQLite schema"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def worker_engine(db, monkeypatch):
+    """Run backfill worker functions in-process against the test database"""
+    monkeypatch.setattr(backfill_service, "_worker_engine", engine)
+    return engine
+
+
+@pytest.fixture
+def pg_engine(monkeypatch):
+    url = os.getenv("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    pg = create_engine(url)
+    Base.metadata.drop_all(bind=pg)
+    Base.metadata.create_all(bind=pg)
+    monkeypatch.setattr(backfill_service, "_worker_engine", pg)
+    try:
+        yield pg
+    finally:
+        Base.metadata.drop_all(bind=pg)
+        pg.dispose()
+
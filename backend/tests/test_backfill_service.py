@@ -0,0 +1,242 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.models.stock import ImportedFile, Stock, StockHistory
+from app.services import backfill_service
+from app.services.backfill_service import (
+    BackfillService,
+    _file_sha256,
+    _load_file,
+    _normalize_chunk,
+    _parse_dates,
+)
+
+
+def write_csv(path, rows, header="Date,Open,High,Low,Close,Volume"):
+    path.write_text("\n".join([header] + rows) + "\n")
+    return path
+
+
+def load(path, symbol, known_sha256=None, chunk_size=1000):
+    stat = os.stat(path)
+    return _load_file(str(path), symbol, stat.st_size, stat.st_mtime_ns, known_sha256, chunk_size)
+
+
+def history(db, symbol):
+    rows = db.query(StockHistory).filter(StockHistory.symbol == symbol).order_by(StockHistory.date).all()
+    return [(row.date, row.close) for row in rows]
+
+
+# _parse_dates
+
+def test_parse_dates_iso_keeps_local_calendar_date():
+    values = pd.Series(["2020-01-02", "2020-01-03 00:00:00-05:00", "2020-01-06T23:00:00+01:00"])
+    assert _parse_dates(values).tolist() == ["2020-01-02", "2020-01-03", "2020-01-06"]
+
+
+def test_parse_dates_us_format():
+    values = pd.Series(["01/02/2020", "12/31/2019"])
+    assert _parse_dates(values).tolist() == ["2020-01-02", "2019-12-31"]
+
+
+def test_parse_dates_mixed_offsets():
+    values = pd.Series(["01/02/2020 09:30-05:00", "Jan 3, 2020 10:00+01:00"])
+    assert _parse_dates(values).tolist() == ["2020-01-02", "2020-01-03"]
+
+
+def test_parse_dates_garbage_is_missing():
+    result = _parse_dates(pd.Series(["2020-01-02", "junk", None, ""]))
+    assert result.iloc[0] == "2020-01-02"
+    assert result.iloc[1:].isna().all()
+
+
+# _normalize_chunk
+
+def test_normalize_chunk_missing_columns():
+    df = pd.DataFrame({"Date": ["2020-01-02"], "Close": [1.0]})
+    with pytest.raises(ValueError, match="missing columns: open, high, low, volume"):
+        _normalize_chunk(df, "AAPL")
+
+
+def test_normalize_chunk_keeps_last_duplicate_date():
+    df = pd.DataFrame({
+        "Date": ["2020-01-02", "2020-01-03", "2020-01-02"],
+        "Open": 1, "High": 1, "Low": 1,
+        "Close": [1.0, 2.0, 3.0],
+        "Volume": 10,
+    })
+    chunk, dropped = _normalize_chunk(df, "AAPL")
+    assert dropped == 0
+    assert sorted(zip(chunk["date"], chunk["close"])) == [("2020-01-02", 3.0), ("2020-01-03", 2.0)]
+    assert list(chunk.columns) == backfill_service.HISTORY_COLUMNS
+    assert chunk["adj_close"].isna().all()
+
+
+def test_normalize_chunk_counts_dropped_rows():
+    df = pd.DataFrame({
+        "Date": ["2020-01-02", "bogus", "2020-01-06", "2020-01-07", "2020-01-08"],
+        "Open": 1, "High": 1, "Low": 1,
+        "Close": [1.0, 2.0, np.nan, np.inf, 5.0],
+        "Adj Close": 1.0,
+        "Volume": [10, 10, 10, 10, np.inf],
+    })
+    chunk, dropped = _normalize_chunk(df, "AAPL")
+    assert dropped == 3
+    assert chunk["date"].tolist() == ["2020-01-02", "2020-01-08"]
+    # A non-finite volume loads as 0 instead of failing the file
+    assert chunk["volume"].tolist() == [10, 0]
+
+
+def test_normalize_chunk_accepts_date_index():
+    df = pd.DataFrame(
+        {"Open": [1.0], "High": [1.0], "Low": [1.0], "Close": [1.0], "Volume": [5]},
+        index=pd.DatetimeIndex(["2020-01-02"], name="Date"),
+    )
+    chunk, _ = _normalize_chunk(df, "AAPL")
+    assert chunk["date"].tolist() == ["2020-01-02"]
+
+
+# File discovery and change detection
+
+def test_split_duplicate_symbols(tmp_path):
+    (tmp_path / "sub").mkdir()
+    files = [
+        write_csv(tmp_path / "AAPL.csv", []),
+        write_csv(tmp_path / "sub" / "aapl.csv", []),
+        write_csv(tmp_path / "MSFT.csv", []),
+    ]
+    unique, duplicates = BackfillService.split_duplicate_symbols(files)
+    assert unique == [tmp_path / "MSFT.csv"]
+    assert duplicates == sorted(files[:2])
+
+
+def test_pending_files_skips_recorded_stat(db, tmp_path):
+    path = write_csv(tmp_path / "AAPL.csv", ["2020-01-02,1,1,1,1,1"])
+    stat = path.stat()
+    db.add(ImportedFile(path=str(path.resolve()), size=stat.st_size, mtime_ns=stat.st_mtime_ns, sha256="abc"))
+    db.commit()
+
+    assert BackfillService(db)._pending_files([path]) == []
+
+    forced = BackfillService(db, force=True)._pending_files([path])
+    assert [(item["symbol"], item["known_sha256"]) for item in forced] == [("AAPL", None)]
+
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    touched = BackfillService(db)._pending_files([path])
+    assert [item["known_sha256"] for item in touched] == ["abc"]
+
+
+def test_load_file_unchanged_sha256_only_refreshes_stat(db, worker_engine, tmp_path):
+    path = write_csv(tmp_path / "AAPL.csv", ["2020-01-02,1,1,1,1,1"])
+    db.add(ImportedFile(path=str(path), size=0, mtime_ns=0, sha256=_file_sha256(str(path)), row_count=1))
+    db.commit()
+
+    result = load(path, "AAPL", known_sha256=_file_sha256(str(path)))
+
+    assert result["status"] == "unchanged"
+    assert history(db, "AAPL") == []
+    record = db.query(ImportedFile).one()
+    db.refresh(record)
+    assert (record.size, record.mtime_ns) == (path.stat().st_size, path.stat().st_mtime_ns)
+
+
+# Loading
+
+def test_load_file_no_valid_rows_rolls_back(db, worker_engine, tmp_path):
+    good = write_csv(tmp_path / "AAPL.csv", ["2020-01-02,1,1,1,1.5,1"])
+    load(good, "AAPL")
+    db.query(ImportedFile).delete()
+    db.commit()
+
+    bad = write_csv(tmp_path / "AAPL.csv", ["junk,1,1,1,1.5,1", "2020-01-03,1,1,1,,1"])
+    with pytest.raises(ValueError, match="no valid rows"):
+        load(bad, "AAPL")
+
+    assert db.query(ImportedFile).count() == 0
+    # The failed reload must not wipe the rows that were already there
+    assert history(db, "AAPL") == [("2020-01-02", 1.5)]
+
+
+def test_load_file_replaces_symbol_rows(db, worker_engine, tmp_path):
+    path = write_csv(tmp_path / "AAPL.csv", [
+        "2020-01-02,1,1,1,1,1", "2020-01-03,1,1,1,2,1", "2020-01-06,1,1,1,3,1",
+    ])
+    load(path, "AAPL")
+    write_csv(path, ["2020-01-02,1,1,1,9,1", "2020-01-06,1,1,1,8,1"])
+    result = load(path, "AAPL")
+
+    assert result["rows"] == 2
+    assert history(db, "AAPL") == [("2020-01-02", 9.0), ("2020-01-06", 8.0)]
+    assert db.query(ImportedFile).one().row_count == 2
+
+
+def test_load_file_keeps_last_row_across_chunks(db, worker_engine, tmp_path):
+    path = write_csv(tmp_path / "AAPL.csv", [
+        "2020-01-02,1,1,1,1,1", "2020-01-03,1,1,1,2,1", "2020-01-02,1,1,1,3,1",
+    ])
+    result = load(path, "AAPL", chunk_size=1)
+
+    assert history(db, "AAPL") == [("2020-01-02", 3.0), ("2020-01-03", 2.0)]
+    assert result["snapshot"]["last_updated"] == "2020-01-03"
+
+
+def test_run_end_to_end(db, tmp_path):
+    write_csv(tmp_path / "AAPL.csv", ["2020-01-02,1,1,1,100,10", "2020-01-03,1,1,1,110,20"])
+    write_csv(tmp_path / "MSFT.csv", ["01/02/2020,1,1,1,50,5"])
+    (tmp_path / "dupes").mkdir()
+    write_csv(tmp_path / "dupes" / "IBM.csv", ["2020-01-02,1,1,1,1,1"])
+    write_csv(tmp_path / "IBM.csv", ["2020-01-02,1,1,1,1,1"])
+
+    result = BackfillService(db, workers=2).run(str(tmp_path))
+
+    assert (result["loaded"], result["unchanged"], result["failed"], result["rows"]) == (2, 0, 2, 3)
+    assert history(db, "AAPL") == [("2020-01-02", 100.0), ("2020-01-03", 110.0)]
+    assert history(db, "IBM") == []
+    aapl = db.query(Stock).filter(Stock.symbol == "AAPL").one()
+    assert (aapl.current_price, aapl.last_updated) == (110.0, "2020-01-03")
+    assert aapl.change_percent == pytest.approx(10.0)
+
+    rerun = BackfillService(db, workers=2).run(str(tmp_path))
+    assert (rerun["loaded"], rerun["unchanged"], rerun["failed"]) == (0, 2, 2)
+
+
+def test_run_does_not_overwrite_fresher_quote(db, tmp_path):
+    db.add(Stock(symbol="AAPL", name="AAPL", current_price=200.0, last_updated="2024-05-01"))
+    db.commit()
+    write_csv(tmp_path / "AAPL.csv", ["2020-01-02,1,1,1,100,10"])
+
+    BackfillService(db, workers=1).run(str(tmp_path))
+
+    stock = db.query(Stock).filter(Stock.symbol == "AAPL").one()
+    db.refresh(stock)
+    assert (stock.current_price, stock.last_updated) == (200.0, "2024-05-01")
+
+
+# PostgreSQL COPY/merge path
+
+@pytest.mark.postgres
+def test_postgres_merge_keeps_last_row_and_replaces(pg_engine, tmp_path):
+    path = write_csv(tmp_path / "AAPL.csv", [
+        "2020-01-02,1,1,1,1,1", "2020-01-03,1,1,1,2,1", "2020-01-06,1,1,1,4,1", "2020-01-02,1,1,1,3,1",
+    ])
+    result = load(path, "AAPL", chunk_size=1)
+    assert result["rows"] == 4
+
+    with pg_engine.connect() as conn:
+        rows = conn.execute(
+            StockHistory.__table__.select().order_by(StockHistory.__table__.c.date)
+        ).mappings().all()
+    assert [(row["date"], row["close"]) for row in rows] == [
+        ("2020-01-02", 3.0), ("2020-01-03", 2.0), ("2020-01-06", 4.0),
+    ]
+
+    write_csv(path, ["2020-01-02,1,1,1,9,1"])
+    load(path, "AAPL", chunk_size=1)
+    with pg_engine.connect() as conn:
+        rows = conn.execute(StockHistory.__table__.select()).mappings().all()
+        imported = conn.execute(ImportedFile.__table__.select()).mappings().all()
+    assert [(row["date"], row["close"]) for row in rows] == [("2020-01-02", 9.0)]
+    assert [row["row_count"] for row in imported] == [1]
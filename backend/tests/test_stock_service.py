@@ -0,0 +1,96 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+
+from app.models.stock import StockHistory
+from app.services.stock_service import StockService
+
+
+def sessions(start, end):
+    day = start
+    while day <= end:
+        if day.weekday() < 5:
+            yield day.strftime("%Y-%m-%d")
+        day += timedelta(days=1)
+
+
+def history_row(symbol, day, close):
+    return {
+        "symbol": symbol, "date": day, "open": close, "high": close, "low": close,
+        "close": close, "adj_close": None, "volume": 1,
+    }
+
+
+@pytest.fixture
+def yahoo(monkeypatch):
+    """Stub the Yahoo fetch with one row per weekday over the period, close=2.0"""
+    calls = []
+
+    async def fetch(symbol, period):
+        calls.append(period)
+        days = {"5d": 7, "3mo": 91, "10y": 3652}[period]
+        today = date.today()
+        return [history_row(symbol, day, 2.0) for day in sessions(today - timedelta(days=days), today)]
+
+    monkeypatch.setattr(StockService, "fetch_historical_data", staticmethod(fetch))
+    return calls
+
+
+def backfill(db, symbol, start, end):
+    db.add_all([StockHistory(**history_row(symbol, day, 1.0)) for day in sessions(start, end)])
+    db.commit()
+
+
+def test_covered_period_is_served_from_database(db, yahoo):
+    today = date.today()
+    backfill(db, "AAPL", today - timedelta(days=200), StockService.last_session_date(today))
+
+    rows = asyncio.run(StockService.get_historical_data(db, "AAPL", "3mo"))
+
+    assert yahoo == []
+    assert rows and {row["close"] for row in rows} == {1.0}
+
+
+def test_stale_backfill_is_extended_from_yahoo(db, yahoo):
+    today = date.today()
+    backfill_end = today - timedelta(days=40)
+    backfill(db, "AAPL", today - timedelta(days=200), backfill_end)
+
+    rows = asyncio.run(StockService.get_historical_data(db, "AAPL", "3mo"))
+
+    assert yahoo == ["3mo"]
+    assert rows[-1]["date"] > backfill_end.strftime("%Y-%m-%d")
+    # Stored sessions win; the missing tail comes from Yahoo
+    assert all(row["close"] == 1.0 for row in rows if row["date"] <= backfill_end.strftime("%Y-%m-%d"))
+    assert any(row["close"] == 2.0 for row in rows)
+
+    # Completed sessions were saved, so the next request needs no Yahoo call
+    latest = max(row.date for row in db.query(StockHistory).filter(StockHistory.symbol == "AAPL"))
+    assert latest == StockService.last_session_date(today).strftime("%Y-%m-%d")
+    asyncio.run(StockService.get_historical_data(db, "AAPL", "5d"))
+    assert yahoo == ["3mo"]
+
+
+def test_period_before_backfill_start_uses_yahoo(db, yahoo):
+    today = date.today()
+    backfill(db, "AAPL", today - timedelta(days=365), StockService.last_session_date(today))
+
+    rows = asyncio.run(StockService.get_historical_data(db, "AAPL", "10y"))
+
+    assert yahoo == ["10y"]
+    assert rows[0]["close"] == 2.0
+
+
+def test_yahoo_failure_returns_stored_rows(db, monkeypatch):
+    async def fetch(symbol, period):
+        return []
+
+    monkeypatch.setattr(StockService, "fetch_historical_data", staticmethod(fetch))
+    today = date.today()
+    backfill(db, "AAPL", today - timedelta(days=60), today - timedelta(days=30))
+
+    rows = asyncio.run(StockService.get_historical_data(db, "AAPL", "3mo"))
+
+    assert [row["close"] for row in rows] == [1.0] * len(rows)
+    assert rows